@@ -1,10 +1,18 @@
-import json
-
 import matplotlib.pyplot as plt
 import numpy.random
 import pandas as pd
-from matplotlib.collections import PatchCollection
-from matplotlib.patches import Polygon
+from matplotlib.collections import PolyCollection
+
+try:
+    import orjson
+except ImportError:
+    import json as orjson
+
+
+def _parse_xy(coord: str) -> (float, float):
+    # Keys look like "(x, y)" - splitting is far cheaper (and safer) than eval
+    x, y = coord[1:-1].split(",", 1)
+    return float(x), float(y)
 
 
 def plot_school_locations():
@@ -19,31 +27,28 @@ def plot_school_locations():
     keys = [set(), set()]
 
     for index, name in enumerate(filenames):
-        file = open(name)
-        data = json.load(file)
-        points = []
+        with open(name, "rb") as file:
+            data = orjson.loads(file.read())
         print(len(data))
         axes[index].bar(data.keys(), data.values())
         axes[index].set_title(name)
-        for coord, value in data.items():
-            x, y = eval(coord)
+        xs = numpy.empty(len(data))
+        ys = numpy.empty(len(data))
+        zs = numpy.empty(len(data))
+        for i, (coord, value) in enumerate(data.items()):
+            xs[i], ys[i] = _parse_xy(coord)
+            zs[i] = value
             keys[index].add(coord)
-            points.append((x, y, value))
         print(name)
-        z_bottom = []
-        for point in points:
-            x, y, z = point
-            if index == 0:
-                z = z * 1
-
-            if (x, y) in z_heights:
-                offset = z_heights[(x, y)]
-                z_bottom.append(offset)
-                z_heights[(x, y)] += z
-            else:
-                z_bottom.append(0)
-                z_heights[(x, y)] = z
-        x, y, z = zip(*points)
+        df = pd.DataFrame({"x": xs, "y": ys, "z": zs})
+        # Bottom of each bar is the height already stacked at that coordinate
+        z_bottom = (df.groupby(["x", "y"])["z"].cumsum() - df["z"]).to_numpy()
+        if z_heights:
+            carried = pd.Series(z_heights)
+            z_bottom += carried.reindex(pd.MultiIndex.from_frame(df[["x", "y"]]), fill_value=0).to_numpy()
+        for key, total in df.groupby(["x", "y"])["z"].sum().items():
+            z_heights[key] = z_heights.get(key, 0) + total
+        x, y, z = xs, ys, zs
         # ax.bar3d(x, y, z_bottom, box_size, box_size, z, shade=True, label=name, color=colours[index])
 
     # ax.legend(loc="upper left")
@@ -55,29 +60,25 @@ def plot_school_locations():
 
 
 def plot_teacher_possibilites():
-    file = open("pre_duplicate_removal/teacher_school_possiblities.json")
-    data = json.load(file)
+    with open("pre_duplicate_removal/teacher_school_possiblities.json", "rb") as file:
+        data = orjson.loads(file.read())
     plt.boxplot(data)
     plt.scatter(0.9 + (numpy.random.random(len(data)) / 5), data)
     plt.show()
 
 
-def build_output_areas() -> PatchCollection:
-    with open("../recordings/v1.0.0-test.json") as file:
-        output_area_polygons = json.load(file)
+def build_output_areas() -> PolyCollection:
+    with open("../recordings/v1.0.0-test.json", "rb") as file:
+        output_area_polygons = orjson.loads(file.read())
     print(output_area_polygons.keys())
 
     output_areas = set(output_area_polygons["OutputArea"].keys())
-    output_area_df = None
-    for area in output_area_polygons["OutputArea"]:
-        records = []
-        for record in output_area_polygons["OutputArea"][area]:
+    records = []
+    for area, area_records in output_area_polygons["OutputArea"].items():
+        for record in area_records:
             record["code"] = area
             records.append(record)
-        if output_area_df is None:
-            output_area_df = pd.DataFrame(records)
-        else:
-            output_area_df = pd.concat([output_area_df, pd.DataFrame(records)])
+    output_area_df = pd.DataFrame.from_records(records)
 
     # output_area_df.append()
     # output_areas
@@ -90,15 +91,11 @@ def build_output_areas() -> PatchCollection:
     for shape in sf.shapeRecords():
         code = shape.record.as_dict(date_strings=True)["code"]
         if code in output_areas:
-            points = shape.shape.points[:]
-            output_area_polygons[code] = points  #
+            output_area_polygons[code] = numpy.asarray(shape.shape.points, dtype=numpy.float64)
 
-    #
-    patches = []
     # Draw Background of Output Areas
-    for (code, poly) in output_area_polygons.items():
-        patches.append(Polygon(poly, closed=True))
-    output_collection = PatchCollection(patches, edgecolors="black", facecolors="red")
+    verts = list(output_area_polygons.values())
+    output_collection = PolyCollection(verts, edgecolors="black", facecolors="red")
     return output_collection
 
 
@@ -109,16 +106,12 @@ def plot_school_outlines():
     fig.set_size_inches(20, 20)
     axes.add_collection(output_collection)
 
-    file = open("locations/schools/raw_schools_locations.json")
-    data = json.load(file)
-    school_patches = []
+    with open("locations/schools/raw_schools_locations.json", "rb") as file:
+        data = orjson.loads(file.read())
+    school_verts = []
     for school, outline in data:
-        points = []
-        for p in outline:
-            # p=eval(p)
-            points.append((p["x"], p["y"]))
-        school_patches.append(Polygon(points, closed=True))
-    collection = PatchCollection(school_patches, edgecolors="black", facecolors="dodgerblue")
+        school_verts.append(numpy.asarray([(p["x"], p["y"]) for p in outline]))
+    collection = PolyCollection(school_verts, edgecolors="black", facecolors="dodgerblue")
     axes.add_collection(collection)
     fig.show()
     plt.autoscale()
@@ -134,16 +127,10 @@ def plot_school_positions():
     fig.set_size_inches(20, 20)
     axes.add_collection(output_collection)
 
-    file = open("missing_schools.json")
-    data = json.load(file)
-    xs = []
-    ys = []
-    for school in data:
-        print(school)
-        x, y = eval(school)
-        xs.append(x)
-        ys.append(y)
-    plt.scatter(xs, ys)
+    with open("missing_schools.json", "rb") as file:
+        data = orjson.loads(file.read())
+    coords = numpy.asarray([_parse_xy(school) for school in data])
+    plt.scatter(coords[:, 0], coords[:, 1])
     plt.show()
 
 
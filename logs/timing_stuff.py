@@ -1,20 +1,19 @@
+import re
+
 import matplotlib.pyplot as plt
-import regex
+import numpy as np
 
-regex = regex.compile(r"(?<=(([a-zA-Z\s]*: )))(\d.\d{3})")
+timing_regex = re.compile(
+    r"Generate Exposures: (\d+\.\d{3}) seconds[^,]*,\s*"
+    r"Apply Exposures: (\d+\.\d{3}) seconds[^,]*,\s*"
+    r"Apply Interventions: (\d+\.\d{3}) seconds")
 fig, axes = plt.subplots(3, 2)  # , wspace=1, hspace=1)
 fig.set_size_inches(24, 24)
 for index, name in enumerate(["log.log", "log_improved_perf.log", "log_multithreaded_exposure_gen.log"]):
-    generate_time, apply_time, intervention_time = [], [], []
-    with open("york_performance_logs/" + name) as logs:
-        for line in logs:
-            result = regex.split(line)
-            if len(result) > 1 and "Generate Exposures" in line:
-                generate_time.append(float(result[3]))
-                apply_time.append(float(result[7]))
-                intervention_time.append(float(result[11]))
-
-    total_time = list(map(sum, zip(*[generate_time, apply_time, intervention_time])))
+    rows = np.fromregex("york_performance_logs/" + name, timing_regex,
+                        dtype=[("generate", "f8"), ("apply", "f8"), ("intervention", "f8")])
+    generate_time, apply_time, intervention_time = rows["generate"], rows["apply"], rows["intervention"]
+    total_time = generate_time + apply_time + intervention_time
     time_step = range(len(generate_time))
     time_per_step = {"Exposure Generation Time (seconds)": generate_time,
                      "Exposure Application Time (seconds)": apply_time,
@@ -1,37 +1,39 @@
-import json
 import math
 import time
 
+try:
+    import orjson
+except ImportError:
+    import json as orjson
+
 import matplotlib.animation as anm
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import shapefile as shp  # Requires the pyshp package
 from matplotlib import cm
-from matplotlib.collections import PatchCollection
-from matplotlib.patches import Polygon
+from matplotlib.collections import PolyCollection
 
 MAX_INFECTED_VALUE = 2000
 MIN_INFECTED_VALUE = 0
 LOG_BASE = 2
 
+cmap = cm.get_cmap("magma")  # .reversed()
+
 
 def build_output_area_df() -> pd.DataFrame:
-    with open("../../recordings/v1.0.0-test.json") as file:
-        output_area_data = json.load(file)
+    with open("../../recordings/v1.0.0-test.json", "rb") as file:
+        output_area_data = orjson.loads(file.read())
     print(output_area_data.keys())
 
-    output_areas = set(output_area_data["OutputArea"].keys())
-    output_area_df = None
-    for area in output_area_data["OutputArea"]:
-        records = []
-        for record in output_area_data["OutputArea"][area]:
+    records = []
+    for area, area_records in output_area_data["OutputArea"].items():
+        for record in area_records:
             record["code"] = area
             records.append(record)
-        if output_area_df is None:
-            output_area_df = pd.DataFrame(records)
-        else:
-            output_area_df = pd.concat([output_area_df, pd.DataFrame(records)])
+    output_area_df = pd.DataFrame.from_records(records)
+    # Categorical codes make every downstream filter an int compare instead of a string compare
+    output_area_df["code"] = output_area_df["code"].astype("category")
 
     print(output_area_df["code"].value_counts())
     return output_area_df
@@ -41,65 +43,62 @@ def build_polygons():
     sf = shp.Reader("../../data/census_map_areas/England_oa_2011/england_oa_2011.shp")
 
     output_area_polygons = {}
-    areas = set(output_area_df["code"].unique())
+    remaining = set(output_area_df["code"].cat.categories)
+    code_field_idx = next(i for i, field in enumerate(sf.fields[1:]) if field[0] == "code")
     print("Reading data")
-    for shape in sf.shapeRecords():
-        code = shape.record.as_dict(date_strings=True)["code"]
-        if code in areas:
-            points = shape.shape.points[:]
-            output_area_polygons[code] = Polygon(points, closed=True)
+    for shape in sf.iterShapeRecords():
+        code = shape.record[code_field_idx]
+        if code in remaining:
+            output_area_polygons[code] = np.asarray(shape.shape.points, dtype=np.float64)
+            remaining.discard(code)
+            # The shapefile covers all of England - stop as soon as the simulated areas are found
+            if not remaining:
+                break
     print("Competed loop")
     return output_area_polygons
 
 
+def build_value_lookups(value):
+    """Precompute per code/time step lookups so the plotting code never scans the full frame"""
+    max_by_code = output_area_df.groupby("code")[value].max().to_dict()
+    pivot = output_area_df.pivot_table(index="time_step", columns="code", values=value, fill_value=0)
+    pivot_arr = pivot.to_numpy()
+    code_idx = {code: i for i, code in enumerate(pivot.columns)}
+    ts_idx = {ts: i for i, ts in enumerate(pivot.index)}
+    return max_by_code, pivot_arr, code_idx, ts_idx
+
+
 def build_patch(value, time_step=None):
     if time_step is not None:
         time_step = int(time_step)
     print("Building graph for ", value, " at index: ", str(time_step))
-    patches = []
+    verts = []
     poly_colors = []
     for (code, poly) in output_area_polygons.items():
         if time_step is None:
-            colour_ranking = math.log(
-                output_area_df.loc[output_area_df["code"] == code][value].max() / MAX_INFECTED_VALUE, LOG_BASE)
+            colour_ranking = math.log(max_by_code[code] / MAX_INFECTED_VALUE, LOG_BASE)
         else:
-            colour_ranking = math.log((1 / LOG_BASE) +
-                                      output_area_df.loc[(output_area_df["time_step"] == time_step) & (
-                                              output_area_df["code"] == code)][
-                                          value] / MAX_INFECTED_VALUE, LOG_BASE)
-        patches.append(poly)
+            colour_ranking = math.log(
+                (1 / LOG_BASE) + pivot_arr[ts_idx[time_step], code_idx[code]] / MAX_INFECTED_VALUE, LOG_BASE)
+        verts.append(poly)
         poly_colors.append(colour_ranking)
-    collection = PatchCollection(patches, edgecolors="black")
+    collection = PolyCollection(verts, edgecolors="black")
     return collection, poly_colors
 
 
 def get_colours(value, time_step=None):
-    if time_step is not None:
-        time_step = int(time_step)
-    poly_colors = []
-    min_val = 0
-    for (code, poly) in output_area_polygons.items():
-        if time_step is None:
-            val = (
-                    output_area_df.loc[output_area_df["code"] == code][
-                        value].max() / MAX_INFECTED_VALUE)
-            min_val = min(val, min_val)
-            colour_ranking = math.log((1 / LOG_BASE) + val, LOG_BASE)
-        else:
-            colour_ranking = math.log((1 / LOG_BASE) + (
-                    output_area_df.loc[(output_area_df["time_step"] == time_step) & (
-                            output_area_df["code"] == code)][
-                        value] / MAX_INFECTED_VALUE), LOG_BASE)
-        poly_colors.append(colour_ranking)
-    print(min_val)
-    return poly_colors
+    if time_step is None:
+        values = np.array([max_by_code[code] for code in output_area_polygons])
+        print(min(values.min() / MAX_INFECTED_VALUE, 0))
+    else:
+        poly_codes = [code_idx[code] for code in output_area_polygons]
+        values = pivot_arr[ts_idx[int(time_step)], poly_codes]
+    return np.log2((1 / LOG_BASE) + values / MAX_INFECTED_VALUE)
 
 
-def plot(value: str, collection: PatchCollection, poly_colours: [float], ax=None, time_step=None):
+def plot(value: str, collection: PolyCollection, poly_colours: [float], ax=None, time_step=None):
     max = output_area_df[value].max()
     min = output_area_df[value].max()
-    mpl
-    cmap = cm.get_cmap("magma")  # .reversed()
     if ax is None:
         ax = plt.gca()
     # fig,ax=plt.subplots()
@@ -120,10 +119,9 @@ def plot(value: str, collection: PatchCollection, poly_colours: [float], ax=None
 
 def animate(frame):
     print("Building frame: ", str(frame))
-    hour = selected_hours[frame]
-    poly_colours = get_colours("infected", hour)
-    colors = cmap(poly_colours)
-    patches.set_facecolor(colors)
+    row = pivot_arr[ts_idx[selected_hours[frame]], poly_col_idx]
+    colours = np.log2((1 / LOG_BASE) + row / MAX_INFECTED_VALUE)
+    patches.set_facecolor(cmap(colours))
     return patches
 
 
@@ -131,6 +129,7 @@ if __name__ == "__main__":
     total_time = time.time()
     func_time = time.time()
     output_area_df = build_output_area_df()
+    max_by_code, pivot_arr, code_idx, ts_idx = build_value_lookups("infected")
     print("Loaded sim data in: ", time.time() - func_time)
     func_time = time.time()
 
@@ -143,7 +142,9 @@ if __name__ == "__main__":
     print(colours)
     exit()
     frames = 100
-    selected_hours = np.linspace(output_area_df.time_step.min(), output_area_df.time_step.max(), num=frames)
+    # Snap the frame hours to time steps that actually exist, so every pivot lookup hits a row
+    unique_time_steps = np.sort(output_area_df["time_step"].unique())
+    selected_hours = unique_time_steps[np.linspace(0, len(unique_time_steps) - 1, num=frames).astype(int)]
     plt.axis("off")
     fig, ax = plt.subplots(1, 1, figsize=(10, 10))
 
@@ -152,7 +153,7 @@ if __name__ == "__main__":
     print("Built patches in: ", time.time() - func_time)
     func_time = time.time()
 
-    cmap = cm.get_cmap("magma")
+    poly_col_idx = np.array([code_idx[code] for code in output_area_polygons])
     ax.add_collection(patches)
     ax.autoscale()
     print("Starting render...")